@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Modo lote: procesa un directorio de imágenes para enrolamiento o verificación masiva.
+
+- Las imágenes se leen, se buscan en la caché de embeddings y, si no están,
+  se decodifican y se detecta el rostro en un pool de hilos.
+- Los rostros pendientes se pasan a Facenet en lotes (una sola predicción por lote).
+- Los embeddings se guardan en la caché persistente: repetir la corrida no
+  ejecuta inferencia.
+- Con --simulate-db se ejecuta validate_face_in_supabase() contra la base en
+  memoria (memory_db.py) sin tocar Supabase ni el relé.
+
+Uso:
+    python batch_mode.py fotos/ --output resultados.jsonl
+    python batch_mode.py fotos/ --simulate-db --db-seed seed.json
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from deepface import DeepFace
+from deepface.commons import functions
+
+import opendoor_server as server
+from embedding_cache import content_hash
+from memory_db import InMemorySupabase
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+MODEL_NAME = "Facenet"
+
+
+# Buscar imágenes en el directorio (recursivo, orden estable)
+def find_images(directory):
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+# Leer, buscar en caché y, si hace falta, decodificar y detectar el rostro (se ejecuta en el pool)
+def prepare_image(path, cache, target_size):
+    item = {'path': path, 'sha256': None, 'cached': False, 'embedding': None, 'face': None, 'error': None}
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        item['sha256'] = content_hash(data)
+
+        if cache is not None:
+            item['embedding'] = cache.get(item['sha256'])
+            if item['embedding'] is not None:
+                item['cached'] = True
+                return item
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            item['error'] = 'No se pudo decodificar la imagen'
+            return item
+
+        # Misma detección y alineación que DeepFace.represent(enforce_detection=False)
+        faces = functions.extract_faces(img=image, target_size=target_size, detector_backend="opencv",
+                                        grayscale=False, enforce_detection=False, align=True)
+        face, region, confidence = faces[0]
+        item['face'] = functions.normalize_input(img=face, normalization="base")
+        item['facial_area'] = region
+        item['face_confidence'] = confidence
+    except Exception as e:
+        item['error'] = str(e)
+    return item
+
+
+# Calcular los embeddings de un lote de rostros con una sola llamada al modelo
+def embed_faces(model, items):
+    batch = np.concatenate([item['face'] for item in items], axis=0)
+    server.pipeline_stats['inferences'] += len(items)
+    if "keras" in str(type(model)):
+        embeddings = model(batch, training=False).numpy()
+    else:
+        embeddings = model.predict(batch, verbose=0)
+    for item, embedding in zip(items, embeddings):
+        item['embedding'] = embedding.tolist()
+        item['face'] = None
+
+
+def run_batch(directory, output_path, batch_size=32, workers=4, simulate_db=False, db_seed=None,
+              include_embeddings=False, zone_id=None):
+    print("📦 [BATCH] Iniciando modo lote...")
+    print(f"   📁 [BATCH] Directorio: {directory}")
+    paths = find_images(directory)
+    print(f"   📊 [BATCH] Imágenes encontradas: {len(paths)}")
+    if not paths:
+        return
+
+    cache = server.embedding_cache
+    if server.MEMORY_BOUNDED and workers > server.MEMORY_MAX_WORKERS:
+        workers = server.MEMORY_MAX_WORKERS
+        print(f"🧮 [BATCH] Memoria acotada: {workers} hilos")
+    zone_id = zone_id or server.ZONE_ID
+    if simulate_db:
+        server.supabase = InMemorySupabase.from_seed_file(db_seed) if db_seed else InMemorySupabase()
+        server.door_dry_run = True
+        print("🧪 [BATCH] Lógica de decisión contra base en memoria")
+
+    model = DeepFace.build_model(MODEL_NAME)
+    target_size = functions.find_target_size(model_name=MODEL_NAME)
+
+    started = time.perf_counter()
+    decisions = Counter()
+    cache_hits = 0
+    errors = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(output_path, 'w', encoding='utf-8') as out:
+        for start in range(0, len(paths), batch_size):
+            chunk = list(pool.map(lambda p: prepare_image(p, cache, target_size), paths[start:start + batch_size]))
+
+            pending = [item for item in chunk if item['face'] is not None]
+            if pending:
+                embed_faces(model, pending)
+                if cache is not None:
+                    cache.put_many([(item['sha256'], item['embedding']) for item in pending])
+
+            for item in chunk:
+                result = {'path': item['path'], 'sha256': item['sha256'], 'cached': item['cached']}
+                if item['error']:
+                    errors += 1
+                    result['error'] = item['error']
+                    print(f"❌ [BATCH] {item['path']}: {item['error']}")
+                else:
+                    cache_hits += item['cached']
+                    if 'face_confidence' in item:
+                        result['face_confidence'] = item['face_confidence']
+                        result['facial_area'] = item['facial_area']
+                    if include_embeddings:
+                        result['embedding'] = item['embedding']
+                    if simulate_db:
+                        validation = server.validate_face_in_supabase(item['embedding'], zone_id)
+                        result['decision'] = validation['type'] if validation else 'validation_failed'
+                        result['has_access'] = bool(validation and validation['user']['hasAccess'])
+                        result['user_id'] = validation['user']['id'] if validation else None
+                        decisions[result['decision']] += 1
+                out.write(json.dumps(result) + "\n")
+
+            print(f"✅ [BATCH] {min(start + batch_size, len(paths))}/{len(paths)} imágenes procesadas")
+
+    elapsed = time.perf_counter() - started
+    print("=" * 60)
+    print(f"📦 [BATCH] Resultados guardados en: {output_path}")
+    print(f"   ⏱️ [BATCH] Tiempo total: {elapsed:.1f} s ({len(paths) / elapsed:.1f} imágenes/s)")
+    print(f"   💾 [BATCH] Aciertos de caché: {cache_hits} | Inferencias: {server.pipeline_stats['inferences']} | Errores: {errors}")
+    for decision, count in decisions.most_common():
+        print(f"   🚪 [BATCH] {decision}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modo lote de OpenDoor: embeddings y decisiones para un directorio de imágenes")
+    parser.add_argument('directory', help="Directorio con imágenes")
+    parser.add_argument('--output', default='batch_results.jsonl', help="Archivo de resultados (JSONL)")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('BATCH_SIZE', '32')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BATCH_WORKERS', '4')), help="Hilos para lectura y detección")
+    parser.add_argument('--simulate-db', action='store_true', help="Ejecutar la lógica de decisión contra la base en memoria")
+    parser.add_argument('--db-seed', help="Archivo JSON para poblar la base en memoria")
+    parser.add_argument('--include-embeddings', action='store_true', help="Incluir los embeddings en los resultados (enrolamiento)")
+    parser.add_argument('--zone-id', help="Zona para la validación (por defecto ZONE_ID)")
+    args = parser.parse_args()
+
+    run_batch(args.directory, args.output, batch_size=args.batch_size, workers=args.workers,
+              simulate_db=args.simulate_db, db_seed=args.db_seed,
+              include_embeddings=args.include_embeddings, zone_id=args.zone_id)
+
+    server.counter_writer.close()
+    if server.embedding_cache is not None:
+        server.embedding_cache.close()
+
+
+if __name__ == "__main__":
+    main()
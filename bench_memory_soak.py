@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Prueba de larga duración (soak) de memoria sobre frames grabados.
+
+Reproduce en bucle un archivo de frames (frame_archive.py) a máxima velocidad
+con el modo de memoria acotada activado, base en memoria y puerta en modo
+simulado. Los frames reproducidos pasan por el pool de frames igual que los de
+la cámara RTSP. Cada cierto tiempo se muestrea la RSS del proceso a un CSV y al final
+se ajusta una recta (mínimos cuadrados) para estimar el crecimiento en MB/h,
+descartando el período de calentamiento (carga del modelo, cachés de TF).
+
+Si no hay archivo grabado, --from-images arma uno sintético a partir de
+imágenes sueltas (por ejemplo temp/*.png) redimensionadas a un tamaño fijo.
+
+Uso:
+    python bench_memory_soak.py --archive recordings/entrada --duration 86400
+    python bench_memory_soak.py --from-images temp --duration 3600 --max-growth-mb-per-hour 2
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+
+# Armar un archivo de frames sintético a partir de imágenes sueltas
+def build_archive(image_dir, directory, width, height):
+    from frame_archive import FrameArchiveWriter
+
+    paths = sorted(p for ext in ('*.png', '*.jpg', '*.jpeg') for p in glob.glob(os.path.join(image_dir, ext)))
+    if not paths:
+        return 0
+    writer = FrameArchiveWriter(directory, max_frames=len(paths))
+    for path in paths:
+        image = cv2.imread(path)
+        if image is not None:
+            writer.append(cv2.resize(image, (width, height)), time.time(), 'synthetic')
+    writer.close()
+    return writer.count
+
+
+# Pendiente de la recta de mínimos cuadrados (MB por hora)
+def growth_per_hour(samples):
+    if len(samples) < 2:
+        return 0.0
+    xs = [hours for hours, _ in samples]
+    ys = [mb for _, mb in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+
+
+def run_soak(archive, duration, sample_every, warmup, output, max_growth):
+    # La configuración del servidor se lee al importarlo
+    os.environ['REPLAY_DIR'] = archive
+    os.environ['REPLAY_SPEED'] = 'max'
+    os.environ['REPLAY_LOOP'] = 'true'
+    os.environ['TEST_MODE'] = 'false'
+    os.environ['MEMORY_BOUNDED'] = 'true'
+    os.environ.setdefault('MEMORY_REPORT_EVERY', '0')
+    os.environ.setdefault('STATS_REPORT_EVERY', '0')
+
+    import opendoor_server as server
+    from memory_db import InMemorySupabase
+    from memory_guard import read_memory_usage, trim_heap
+
+    if server.frame_replay is None:
+        print("❌ [SOAK] No se pudo abrir el archivo de frames")
+        return None
+    server.supabase = InMemorySupabase()
+    server.door_dry_run = True
+
+    print("🧪 [SOAK] Iniciando prueba de memoria sobre frames grabados...")
+    print("=" * 60)
+    print(f"   ⏱️ [SOAK] Duración: {duration / 3600:.2f} h | Muestreo: {sample_every:.0f} s | Calentamiento: {warmup:.0f} s")
+
+    started = time.monotonic()
+    next_sample = started
+    samples = []
+    cycles = 0
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['elapsed_s', 'cycles', 'vm_rss_mb', 'rss_anon_mb', 'rss_file_mb'])
+        while time.monotonic() - started < duration:
+            server.run_cycle(server.process_frame, 'replay')
+            cycles += 1
+            # Los logs viven en Supabase, no en el servidor: no se acumulan en la base simulada
+            with server.supabase._lock:
+                server.supabase.tables['logs'].clear()
+
+            now = time.monotonic()
+            if now >= next_sample:
+                trim_heap()
+                usage = read_memory_usage()
+                elapsed = now - started
+                writer.writerow([f"{elapsed:.0f}", cycles, f"{usage.get('VmRSS', 0):.1f}",
+                                 f"{usage.get('RssAnon', 0):.1f}", f"{usage.get('RssFile', 0):.1f}"])
+                f.flush()
+                if elapsed >= warmup:
+                    samples.append((elapsed / 3600, usage.get('RssAnon', usage.get('VmRSS', 0))))
+                print(f"🧮 [SOAK] {elapsed / 3600:.2f} h | ciclos: {cycles} | RSS: {usage.get('VmRSS', 0):.1f} MB "
+                      f"(anónima {usage.get('RssAnon', 0):.1f} MB)")
+                next_sample += sample_every
+
+    server.counter_writer.close()
+    growth = growth_per_hour(samples)
+    print("=" * 60)
+    print(f"📊 [SOAK] Ciclos: {cycles} | Muestras tras calentamiento: {len(samples)}")
+    print(f"📊 [SOAK] Pool de frames: {server.frame_pool.stats if server.frame_pool else 'no usado'}")
+    print(f"📊 [SOAK] Crecimiento de RSS anónima: {growth:+.2f} MB/h (límite {max_growth:.2f} MB/h)")
+    print(f"📊 [SOAK] Muestras guardadas en: {output}")
+    if growth > max_growth:
+        print("❌ [SOAK] La memoria crece: posible fuga")
+    else:
+        print("✅ [SOAK] RSS estable")
+    return growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak de memoria del pipeline sobre frames grabados")
+    parser.add_argument('--archive', help="Directorio de un archivo de frames (RECORD_DIR)")
+    parser.add_argument('--from-images', help="Armar un archivo sintético a partir de las imágenes de este directorio")
+    parser.add_argument('--frame-size', default='1280x720', help="Tamaño de los frames sintéticos (ANCHOxALTO)")
+    parser.add_argument('--duration', type=float, default=24 * 3600, help="Duración en segundos (por defecto 24 h)")
+    parser.add_argument('--sample-every', type=float, default=60, help="Segundos entre muestras de RSS")
+    parser.add_argument('--warmup', type=float, default=600, help="Segundos iniciales que no cuentan para la tendencia")
+    parser.add_argument('--output', default='memory_soak.csv', help="CSV con las muestras de RSS")
+    parser.add_argument('--max-growth-mb-per-hour', type=float, default=1.0)
+    args = parser.parse_args()
+
+    archive = args.archive
+    if not archive:
+        if not args.from_images:
+            parser.error("se requiere --archive o --from-images")
+        width, height = (int(v) for v in args.frame_size.lower().split('x'))
+        archive = tempfile.mkdtemp(prefix='opendoor-soak-')
+        count = build_archive(args.from_images, archive, width, height)
+        if not count:
+            print(f"❌ [SOAK] No hay imágenes en {args.from_images}")
+            sys.exit(1)
+        print(f"📼 [SOAK] Archivo sintético: {count} frames de {width}x{height} en {archive}")
+
+    growth = run_soak(archive, args.duration, args.sample_every, args.warmup, args.output,
+                      args.max_growth_mb_per_hour)
+    sys.exit(0 if growth is not None and growth <= args.max_growth_mb_per_hour else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga (soak) del camino de comandos al relé contra un broker local simulado.
+
+El broker simulado implementa lo mínimo de MQTT 3.1.1 (CONNECT, PUBLISH QoS 0/1,
+SUBSCRIBE, PINGREQ, DISCONNECT), puede agregar demora al PUBACK, perder PUBACKs
+y cortar la conexión cada cierto tiempo para ejercitar la reconexión. Recuerda
+los client_id con sesión persistente para responder "session present".
+
+Con --checks se verifican antes del soak dos casos puntuales:
+- un comando sin PUBACK no se vuelve a publicar al reconectar;
+- un comando cuya publicación falló (socket caído) no se envía al conectar;
+- varios ON simultáneos generan una sola publicación.
+
+Uso:
+    python bench_mqtt_relay.py --checks --duration 0
+    python bench_mqtt_relay.py --duration 60 --rate 20
+    python bench_mqtt_relay.py --duration 300 --ack-delay-ms 5 --drop-rate 0.01 --blip-every 30
+"""
+
+import argparse
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from mqtt_relay import RelayCommander
+
+CONNECT, CONNACK, PUBLISH, PUBACK, SUBSCRIBE, SUBACK = 1, 2, 3, 4, 8, 9
+PINGREQ, PINGRESP, DISCONNECT = 12, 13, 14
+
+
+def _read_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("conexión cerrada")
+        data += chunk
+    return data
+
+
+def _read_packet(sock):
+    header = _read_exact(sock, 1)[0]
+    length, multiplier = 0, 1
+    while True:
+        byte = _read_exact(sock, 1)[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    return header >> 4, header & 0x0F, _read_exact(sock, length)
+
+
+class _BrokerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        broker = self.server.broker
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        broker.connections.append(sock)
+        send_lock = threading.Lock()
+
+        def send(data):
+            with send_lock:
+                sock.sendall(data)
+
+        try:
+            while True:
+                packet_type, flags, body = _read_packet(sock)
+                if packet_type == CONNECT:
+                    name_length = struct.unpack('!H', body[:2])[0]
+                    connect_flags = body[2 + name_length + 1]
+                    id_offset = 2 + name_length + 4
+                    id_length = struct.unpack('!H', body[id_offset:id_offset + 2])[0]
+                    client_id = body[id_offset + 2:id_offset + 2 + id_length].decode('utf-8')
+                    if connect_flags & 0x02:
+                        broker.sessions.discard(client_id)
+                        session_present = 0
+                    else:
+                        session_present = int(client_id in broker.sessions)
+                        broker.sessions.add(client_id)
+                    send(bytes([CONNACK << 4, 2, session_present, 0]))
+                elif packet_type == PUBLISH:
+                    qos = (flags >> 1) & 0x03
+                    topic_length = struct.unpack('!H', body[:2])[0]
+                    broker.published += 1
+                    payload_offset = 2 + topic_length + (2 if qos else 0)
+                    broker.messages.append((time.monotonic(), bool(flags & 0x08), body[payload_offset:]))
+                    if qos == 1:
+                        mid = body[2 + topic_length:4 + topic_length]
+                        if random.random() < broker.drop_rate:
+                            continue
+                        puback = bytes([PUBACK << 4, 2]) + mid
+                        if broker.ack_delay:
+                            threading.Timer(broker.ack_delay, send, args=(puback,)).start()
+                        else:
+                            send(puback)
+                elif packet_type == SUBSCRIBE:
+                    topics = 0
+                    offset = 2
+                    while offset < len(body):
+                        offset += 2 + struct.unpack('!H', body[offset:offset + 2])[0] + 1
+                        topics += 1
+                    send(bytes([SUBACK << 4, 2 + topics]) + body[:2] + bytes([1] * topics))
+                elif packet_type == PINGREQ:
+                    send(bytes([PINGRESP << 4, 0]))
+                elif packet_type == DISCONNECT:
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if sock in broker.connections:
+                broker.connections.remove(sock)
+
+
+class LocalBroker:
+    def __init__(self, port=0, ack_delay_ms=0.0, drop_rate=0.0):
+        self.ack_delay = ack_delay_ms / 1000.0
+        self.drop_rate = drop_rate
+        self.published = 0
+        self.messages = []  # (hora, DUP, payload) de cada PUBLISH recibido
+        self.sessions = set()
+        self.connections = []
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', port), _BrokerHandler)
+        self.server.daemon_threads = True
+        self.server.broker = self
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    # Simular una caída del broker cerrando todas las conexiones
+    def blip(self):
+        for sock in list(self.connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.blip()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Un comando sin PUBACK no debe volver a publicarse tras una reconexión
+def check_no_redelivery(ack_timeout=0.5):
+    broker = LocalBroker(drop_rate=1.0)
+    broker.start()
+    relay = RelayCommander('127.0.0.1', broker.port, 'opendoor/soak/relay', client_id='opendoor-check',
+                           ack_timeout=ack_timeout, reconnect_min_delay=1, reconnect_max_delay=1, verbose=False)
+    relay.start()
+    relay.wait_connected(5)
+    acked = relay.send("ON")
+    published = broker.published
+    broker.drop_rate = 0.0
+    broker.blip()
+    time.sleep(0.2)
+    relay.wait_connected(5)
+    time.sleep(0.5)
+    redelivered = broker.published - published
+    relay.close()
+    broker.stop()
+    ok = not acked and published == 1 and redelivered == 0
+    print(f"{'✅' if ok else '❌'} [CHECK] Comando vencido: confirmado={acked} publicaciones={published} "
+          f"reenvíos tras reconectar={redelivered} (conexiones: {relay.stats['connects']})")
+    return ok
+
+
+# Un comando publicado con el socket caído (antes de que paho llame on_disconnect)
+# falla y no debe enviarse cuando el cliente conecte
+def check_no_send_after_failed_publish():
+    broker = LocalBroker()
+    broker.start()
+    relay = RelayCommander('127.0.0.1', broker.port, 'opendoor/soak/relay', client_id='opendoor-check-offline',
+                           reconnect_min_delay=1, reconnect_max_delay=1, verbose=False)
+    relay._connected.set()  # El relé aún se cree conectado, pero paho no tiene socket
+    acked = relay.send("ON")
+    relay.start()
+    relay.wait_connected(5)
+    time.sleep(0.5)
+    relay.close()
+    broker.stop()
+    ok = not acked and broker.published == 0
+    print(f"{'✅' if ok else '❌'} [CHECK] Publicación sin conexión: confirmado={acked} "
+          f"publicaciones tras conectar={broker.published}")
+    return ok
+
+
+# Varios ON simultáneos dentro de la ventana de pulso se publican una sola vez
+def check_on_dedupe(concurrent=3):
+    broker = LocalBroker(ack_delay_ms=50)
+    broker.start()
+    relay = RelayCommander('127.0.0.1', broker.port, 'opendoor/soak/relay', client_id='opendoor-check-dedupe',
+                           verbose=False)
+    relay.start()
+    relay.wait_connected(5)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(relay.send("ON"))) for _ in range(concurrent)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.append(relay.send("ON"))  # Dentro de la ventana de pulso
+    relay.close()
+    broker.stop()
+    ok = all(results) and broker.published == 1
+    print(f"{'✅' if ok else '❌'} [CHECK] Deduplicación de ON: {len(results)} comandos, "
+          f"{broker.published} publicaciones, deduplicados={relay.stats['deduped']}")
+    return ok
+
+
+def run_soak(duration, rate, ack_delay_ms, drop_rate, blip_every, ack_timeout, pulse_window):
+    print("🧪 [SOAK] Iniciando prueba de carga del camino de comandos al relé...")
+    print("=" * 60)
+    broker = LocalBroker(ack_delay_ms=ack_delay_ms, drop_rate=drop_rate)
+    broker.start()
+    print(f"📡 [SOAK] Broker simulado en 127.0.0.1:{broker.port} (demora PUBACK: {ack_delay_ms} ms, "
+          f"pérdida: {drop_rate:.1%})")
+
+    relay = RelayCommander('127.0.0.1', broker.port, 'opendoor/soak/relay', client_id='opendoor-soak',
+                           ack_timeout=ack_timeout, pulse_window=pulse_window,
+                           reconnect_min_delay=1, reconnect_max_delay=2, verbose=False)
+    relay.start()
+    if not relay.wait_connected(5):
+        print("❌ [SOAK] No se pudo conectar al broker simulado")
+        broker.stop()
+        return None
+
+    interval = 1.0 / rate
+    started = time.monotonic()
+    next_blip = started + blip_every if blip_every else None
+    commands = 0
+    succeeded = 0
+    while time.monotonic() - started < duration:
+        cycle_start = time.monotonic()
+        if next_blip and cycle_start >= next_blip:
+            print("⚡ [SOAK] Cortando conexiones del broker...")
+            broker.blip()
+            next_blip += blip_every
+
+        # Alternar ON/OFF para que cada comando llegue al broker (ON repetidos se deduplican)
+        succeeded += relay.send("ON" if commands % 2 == 0 else "OFF")
+        commands += 1
+        time.sleep(max(0.0, interval - (time.monotonic() - cycle_start)))
+
+    latency = relay.latency_summary()
+    relay.close()
+    broker.stop()
+
+    print("=" * 60)
+    print(f"📊 [SOAK] Comandos: {commands} | Confirmados: {succeeded} ({succeeded / max(commands, 1):.2%})")
+    print(f"📊 [SOAK] Estadísticas del relé: {relay.stats}")
+    if latency:
+        print(f"📊 [SOAK] Latencia publicación -> PUBACK: p50={latency['p50_ms']:.2f} ms "
+              f"p99={latency['p99_ms']:.2f} ms max={latency['max_ms']:.2f} ms")
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak del camino de comandos MQTT al relé")
+    parser.add_argument('--duration', type=float, default=60, help="Duración en segundos")
+    parser.add_argument('--rate', type=float, default=20, help="Comandos por segundo")
+    parser.add_argument('--ack-delay-ms', type=float, default=0, help="Demora agregada a cada PUBACK")
+    parser.add_argument('--drop-rate', type=float, default=0, help="Fracción de PUBACKs que se pierden")
+    parser.add_argument('--blip-every', type=float, default=0, help="Cortar conexiones cada N segundos (0 = nunca)")
+    parser.add_argument('--ack-timeout', type=float, default=2.0)
+    parser.add_argument('--pulse-window', type=float, default=3.0)
+    parser.add_argument('--checks', action='store_true', help="Verificar no-reenvío de comandos vencidos y deduplicación de ON")
+    args = parser.parse_args()
+    if args.checks:
+        print("🧪 [CHECK] Verificaciones puntuales del camino de comandos...")
+        results = [check_no_redelivery(args.ack_timeout / 4), check_no_send_after_failed_publish(), check_on_dedupe()]
+        if not all(results):
+            raise SystemExit(1)
+    if args.duration <= 0:
+        return
+    run_soak(args.duration, args.rate, args.ack_delay_ms, args.drop_rate, args.blip_every,
+             args.ack_timeout, args.pulse_window)
+
+
+if __name__ == "__main__":
+    main()
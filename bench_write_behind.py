@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Verificaciones de la escritura diferida de contadores (write_behind.py).
+
+Ejecuta validate_face_in_supabase() contra la base en memoria (memory_db.py)
+con la puerta en modo simulado y compara los contadores tras el flush con lo
+que darían las escrituras inmediatas:
+- denegado y luego concedido dentro de la misma ventana de flush -> 0;
+- concedido y luego denegado -> 1;
+- incrementos concurrentes desde varios hilos -> ninguno se pierde.
+Cada caso se corre con la RPC apply_access_counter_deltas y con UPDATE por identidad.
+
+Uso:
+    python bench_write_behind.py
+"""
+
+import os
+import sys
+import threading
+
+# Flush solo manual: todas las decisiones de un caso caen en la misma ventana
+os.environ['COUNTER_FLUSH_INTERVAL'] = '3600'
+os.environ['TEST_MODE'] = 'true'
+
+import opendoor_server as server
+from memory_db import InMemorySupabase
+
+USER_ID = 'user-check'
+ALLOWED_ZONE = 'zone-allowed'
+OTHER_ZONE = 'zone-other'
+EMBEDDING = [1.0] + [0.0] * 127
+
+
+def new_database():
+    return InMemorySupabase({
+        'users': [{'id': USER_ID, 'full_name': 'Usuario de prueba', 'zones': [{'id': ALLOWED_ZONE}],
+                   'statuses': {'id': 'active'}, 'consecutive_denied_accesses': 0}],
+        'user_face_embeddings': [{'user_id': USER_ID, 'embedding': EMBEDDING}],
+    })
+
+
+def denied_counter(zones, use_rpc, threads=1):
+    server.supabase = new_database()
+    server.door_dry_run = True
+    server.counter_writer.use_rpc = use_rpc
+
+    def decide():
+        for zone in zones:
+            server.validate_face_in_supabase(EMBEDDING, zone)
+
+    workers = [threading.Thread(target=decide) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    server.counter_writer.flush()
+    return server.supabase.tables['users'][0]['consecutive_denied_accesses']
+
+
+def main():
+    cases = [
+        ("Denegado -> concedido", [OTHER_ZONE, ALLOWED_ZONE], 1, 0),
+        ("Concedido -> denegado", [ALLOWED_ZONE, OTHER_ZONE], 1, 1),
+        ("Denegados concurrentes (8 hilos x 5)", [OTHER_ZONE] * 5, 8, 40),
+    ]
+    results = []
+    for use_rpc in (True, False):
+        mode = "RPC" if use_rpc else "UPDATE"
+        for name, zones, threads, expected in cases:
+            value = denied_counter(zones, use_rpc, threads)
+            ok = value == expected
+            results.append((ok, f"{'✅' if ok else '❌'} [CHECK] {name} ({mode}): "
+                                f"consecutive_denied_accesses={value} (esperado {expected})"))
+    server.counter_writer.close()
+
+    print("=" * 60)
+    for _, line in results:
+        print(line)
+    sys.exit(0 if all(ok for ok, _ in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
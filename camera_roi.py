@@ -0,0 +1,111 @@
+"""
+Región de interés (ROI) y reducción de escala adaptativa por cámara.
+
+Los rostros en la puerta solo aparecen en una zona fija del encuadre. Antes de
+la detección se recorta el rectángulo que contiene el polígono de la ROI (una
+vista de NumPy, sin copia) y se reduce a la escala más pequeña a la que los
+rostros vistos recientemente siguen superando el tamaño mínimo del detector.
+
+Formato del archivo de configuración (CAMERA_ROI_CONFIG):
+    {
+        "main-entrance": {
+            "roi": [[420, 80], [1180, 80], [1180, 700], [420, 700]],
+            "detection_width": 480,
+            "min_face_px": 80
+        }
+    }
+"""
+
+import json
+from collections import deque
+
+import cv2
+import numpy as np
+
+SCALE_STEPS = (0.25, 0.375, 0.5, 0.75, 1.0)
+
+
+class CameraROI:
+    def __init__(self, polygon=None, detection_width=None, min_face_px=80, history=20, max_misses=3):
+        self.polygon = np.array(polygon, dtype=np.int32) if polygon else None
+        self.detection_width = detection_width
+        self.min_face_px = min_face_px
+        self.max_misses = max_misses
+        self._face_heights = deque(maxlen=history)
+        self._misses = 0
+        if self.polygon is not None:
+            x, y, w, h = cv2.boundingRect(self.polygon)
+            self.bounds = (max(x, 0), max(y, 0), x + w, y + h)
+        else:
+            self.bounds = None
+
+    @classmethod
+    def from_config(cls, path, camera_id):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f).get(camera_id, {})
+        return cls(polygon=config.get('roi'),
+                   detection_width=config.get('detection_width'),
+                   min_face_px=config.get('min_face_px', 80))
+
+    @property
+    def enabled(self):
+        return self.polygon is not None or self.detection_width is not None
+
+    # Recorte del rectángulo de la ROI como vista del frame original (sin copia)
+    def crop(self, frame):
+        if self.bounds is None:
+            return frame, 0, 0
+        x0, y0, x1, y1 = self.bounds
+        return frame[y0:y1, x0:x1], x0, y0
+
+    # Escala más pequeña a la que el rostro más chico reciente sigue pasando min_face_px
+    def choose_scale(self, width):
+        if self._face_heights:
+            smallest = min(self._face_heights)
+            for scale in SCALE_STEPS:
+                if smallest * scale >= self.min_face_px:
+                    return scale
+            return 1.0
+        if self.detection_width and width > self.detection_width:
+            return self.detection_width / width
+        return 1.0
+
+    # Imagen lista para el detector y transformación para volver a coordenadas del frame
+    def prepare(self, frame):
+        image, x0, y0 = self.crop(frame)
+        scale = self.choose_scale(image.shape[1])
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return image, (x0, y0, scale)
+
+    def to_frame_coords(self, facial_area, transform):
+        x0, y0, scale = transform
+        return (int(facial_area['x'] / scale) + x0, int(facial_area['y'] / scale) + y0,
+                int(facial_area['w'] / scale), int(facial_area['h'] / scale))
+
+    def contains(self, x, y):
+        if self.polygon is None:
+            return True
+        return cv2.pointPolygonTest(self.polygon, (float(x), float(y)), False) >= 0
+
+    # Primer rostro de DeepFace cuyo centro cae dentro del polígono; actualiza el historial de tamaños
+    def select_face(self, representations, transform, detection_shape):
+        for representation in representations:
+            area = representation.get('facial_area') if isinstance(representation, dict) else None
+            if not area:
+                return representation
+            # Sin detección, DeepFace devuelve la imagen completa como rostro
+            if area['w'] >= detection_shape[1] and area['h'] >= detection_shape[0]:
+                break
+            x, y, w, h = self.to_frame_coords(area, transform)
+            if self.contains(x + w / 2, y + h / 2):
+                self._face_heights.append(h)
+                self._misses = 0
+                return representation
+
+        # Tras varios fallos seguidos se olvida el historial y se vuelve a la escala objetivo
+        self._misses += 1
+        if self._misses >= self.max_misses:
+            self._face_heights.clear()
+            self._misses = 0
+        return None
@@ -0,0 +1,70 @@
+"""
+Caché persistente de embeddings en disco (SQLite).
+
+La clave es el hash SHA-256 del contenido de la imagen más la versión del
+modelo, así que volver a procesar los mismos archivos no ejecuta inferencia y
+un cambio de modelo invalida la caché sin borrarla.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path, model_version):
+        self.path = path
+        self.model_version = model_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " content_hash TEXT NOT NULL,"
+            " model_version TEXT NOT NULL,"
+            " embedding TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (content_hash, model_version))"
+        )
+        self._conn.commit()
+
+    # Devuelve el embedding guardado o None si no está en caché
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT embedding FROM embeddings WHERE content_hash = ? AND model_version = ?",
+                (key, self.model_version),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, embedding):
+        self.put_many([(key, embedding)])
+
+    def put_many(self, items):
+        rows = [
+            (key, self.model_version, json.dumps(embedding), time.time())
+            for key, embedding in items
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,181 @@
+"""
+Archivo de frames para grabar y reproducir tráfico real de la puerta.
+
+Estructura de un archivo (directorio):
+    meta.json    -> forma y tipo de los frames, capacidad
+    frames.bin   -> frames crudos de forma fija en un archivo mapeado a memoria
+                    (se preasigna para max_frames y al cerrar se recorta a los grabados)
+    index.jsonl  -> una línea por frame: timestamp de captura y decisión tomada
+                    (los frames de una misma ráfaga comparten 'burst')
+
+La lectura es zero-copy: cada frame es una vista del archivo mapeado.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+ARCHIVE_VERSION = 1
+META_FILE = "meta.json"
+FRAMES_FILE = "frames.bin"
+INDEX_FILE = "index.jsonl"
+
+
+class FrameArchiveWriter:
+    def __init__(self, directory, max_frames=2000):
+        self.directory = directory
+        self.max_frames = max_frames
+        self.count = 0
+        self.bursts = 0
+        self.shape = None
+        self._meta = None
+        self._frames = None
+        self._index_file = None
+
+    # Crear los archivos al recibir el primer frame (la forma queda fija)
+    def _open(self, frame):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(os.path.join(self.directory, META_FILE)):
+            raise FileExistsError(f"Ya existe un archivo de frames en {self.directory}")
+
+        self.shape = tuple(frame.shape)
+        self._meta = {
+            'version': ARCHIVE_VERSION,
+            'shape': list(self.shape),
+            'dtype': str(frame.dtype),
+            'capacity': self.max_frames,
+            'created_at': time.time(),
+        }
+        self._frames = np.memmap(os.path.join(self.directory, FRAMES_FILE), dtype=frame.dtype,
+                                 mode='w+', shape=(self.max_frames,) + self.shape)
+        self._write_meta()
+        self._index_file = open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8")
+
+    # Agregar un frame con su timestamp y decisión; devuelve False si no se grabó
+    def append(self, frame, timestamp, decision=None):
+        return self.append_burst([frame], timestamp, decision)
+
+    # Agregar todos los frames de una ráfaga (todos o ninguno); en la reproducción
+    # se vuelven a entregar juntos, como los leyó la cámara
+    def append_burst(self, frames, timestamp, decision=None):
+        if self._frames is None:
+            self._open(frames[0])
+        if self.count + len(frames) > self.max_frames:
+            return False
+        for frame in frames:
+            if tuple(frame.shape) != self.shape:
+                print(f"⚠️ [RECORDER] Frame con forma {frame.shape} descartado (esperado: {self.shape})")
+                return False
+
+        burst = self.bursts if len(frames) > 1 else None
+        for frame in frames:
+            self._frames[self.count] = frame
+            entry = {'frame': self.count, 'timestamp': timestamp, 'decision': decision}
+            if burst is not None:
+                entry['burst'] = burst
+            self._index_file.write(json.dumps(entry) + "\n")
+            self.count += 1
+        self._index_file.flush()
+        if burst is not None:
+            self.bursts += 1
+        if self.count + len(frames) > self.max_frames:
+            print(f"⚠️ [RECORDER] Capacidad máxima alcanzada ({self.count}/{self.max_frames} frames)")
+        return True
+
+    def _write_meta(self):
+        with open(os.path.join(self.directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(self._meta, f, indent=2)
+
+    # Cerrar y recortar frames.bin a los frames grabados (la capacidad no usada no ocupa disco)
+    def close(self):
+        if self._frames is not None:
+            self._frames.flush()
+            frame_bytes = self._frames.itemsize * int(np.prod(self.shape))
+            mapping, self._frames = self._frames._mmap, None
+            if mapping is not None:
+                mapping.close()
+            os.truncate(os.path.join(self.directory, FRAMES_FILE), self.count * frame_bytes)
+            self._meta['capacity'] = self.count
+            self._write_meta()
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+
+class FrameArchive:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.shape = tuple(self.meta['shape'])
+        self.entries = []
+        with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self.entries.append(json.loads(line))
+        if self.meta['capacity'] == 0:
+            # Archivo cerrado sin frames: frames.bin quedó vacío y no se puede mapear
+            self._frames = np.empty((0,) + self.shape, dtype=self.meta['dtype'])
+        else:
+            self._frames = np.memmap(os.path.join(directory, FRAMES_FILE), dtype=self.meta['dtype'],
+                                     mode='r', shape=(self.meta['capacity'],) + self.shape)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Vista de solo lectura sobre el archivo mapeado (sin copia)
+    def frame(self, i):
+        return self._frames[self.entries[i]['frame']]
+
+
+class ReplaySource:
+    # speed: 1.0 = tiempo real, 2.0 = doble velocidad, 0 = máxima velocidad
+    def __init__(self, archive, speed=1.0, loop=False):
+        self.archive = archive
+        self.speed = speed
+        self.loop = loop
+        self.position = 0
+        self.finished = len(archive) == 0
+        self._wall_start = None
+        self._archive_start = None
+
+    # Devuelve (frame, entrada del índice) o None al terminar
+    def next(self):
+        if self.finished:
+            return None
+        if self.position >= len(self.archive):
+            if not self.loop:
+                self.finished = True
+                return None
+            self.position = 0
+            self._wall_start = None
+
+        entry = self.archive.entries[self.position]
+        if self.speed > 0:
+            if self._wall_start is None:
+                self._wall_start = time.monotonic()
+                self._archive_start = entry['timestamp']
+            due = self._wall_start + (entry['timestamp'] - self._archive_start) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = self.archive.frame(self.position)
+        self.position += 1
+        return frame, entry
+
+    # Devuelve la lista de (frame, entrada) de la próxima ráfaga grabada; un frame
+    # grabado sin ráfaga se devuelve solo. Lista vacía al terminar.
+    def next_burst(self):
+        first = self.next()
+        if first is None:
+            return []
+        items = [first]
+        burst = first[1].get('burst')
+        while (burst is not None and self.position < len(self.archive)
+               and self.archive.entries[self.position].get('burst') == burst):
+            items.append(self.next())
+        return items
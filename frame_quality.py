@@ -0,0 +1,88 @@
+"""
+Puntuación barata de calidad de frames para elegir qué frame de una ráfaga
+se envía a DeepFace.
+
+Cada frame se puntúa con tres factores que se multiplican:
+- nitidez: varianza del Laplaciano sobre el rostro
+- tamaño: alto del rostro en píxeles
+- pose frontal: simetría e inclinación de los ojos dentro del rostro
+
+Se usan las mismas cascadas Haar que el detector 'opencv' de DeepFace, por lo
+que un frame sin rostro aquí tampoco tendría rostro para DeepFace.
+"""
+
+import cv2
+import numpy as np
+
+FACE_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+EYE_CASCADE = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+
+# Valores de referencia: a partir de ellos el factor correspondiente vale 1.0
+SHARPNESS_REFERENCE = 150.0
+FACE_SIZE_REFERENCE_PX = 120
+NO_EYES_FRONTAL_SCORE = 0.3  # Perfil, ojos cerrados u oclusión
+DETECTION_WIDTH = 320  # Ancho al que se reduce el frame para buscar rostros
+HAAR_WINDOW_PX = 24  # Rostro más chico que detecta la cascada
+FACE_NORMALIZED_PX = 128  # Lado del rostro normalizado para nitidez y ojos
+
+
+def score_frame(frame, min_face_px=40):
+    result = {'score': 0.0, 'face': None, 'sharpness': 0.0, 'face_px': 0, 'frontal': 0.0}
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    # Reducir hasta DETECTION_WIDTH, pero nunca tanto que un rostro de min_face_px
+    # (en píxeles originales) quede por debajo de la ventana de la cascada
+    scale = min(1.0, max(DETECTION_WIDTH / gray.shape[1], HAAR_WINDOW_PX / max(min_face_px, 1)))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    min_size = max(int(min_face_px * scale), HAAR_WINDOW_PX)
+    faces = FACE_CASCADE.detectMultiScale(small, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size))
+    if len(faces) == 0:
+        return result
+
+    # Quedarse con el rostro más grande y volver a coordenadas originales
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    x, y, w, h = (int(v / scale) for v in (x, y, w, h))
+    # Normalizar el rostro a un tamaño fijo: nitidez comparable entre tamaños y ojos baratos de buscar
+    face = cv2.resize(gray[y:y + h, x:x + w], (FACE_NORMALIZED_PX, FACE_NORMALIZED_PX), interpolation=cv2.INTER_AREA)
+
+    sharpness = float(cv2.Laplacian(face, cv2.CV_64F).var())
+    frontal = _frontal_score(face)
+
+    result['face'] = (x, y, w, h)
+    result['sharpness'] = sharpness
+    result['face_px'] = h
+    result['frontal'] = frontal
+    result['score'] = (min(sharpness / SHARPNESS_REFERENCE, 1.0)
+                       * min(h / FACE_SIZE_REFERENCE_PX, 1.0)
+                       * frontal)
+    return result
+
+
+def _frontal_score(face):
+    h, w = face.shape[:2]
+    upper = face[:h // 2]
+    eyes = EYE_CASCADE.detectMultiScale(upper, scaleFactor=1.1, minNeighbors=5,
+                                        minSize=(max(w // 10, 8), max(w // 10, 8)))
+    if len(eyes) < 2:
+        return NO_EYES_FRONTAL_SCORE
+
+    # Los dos ojos más grandes, ordenados de izquierda a derecha
+    eyes = sorted(sorted(eyes, key=lambda e: e[2] * e[3], reverse=True)[:2], key=lambda e: e[0])
+    centers = [(ex + ew / 2, ey + eh / 2) for ex, ey, ew, eh in eyes]
+    (lx, ly), (rx, ry) = centers
+    dx = max(rx - lx, 1.0)
+
+    # Simetría horizontal: el punto medio de los ojos debe caer en el centro del rostro
+    symmetry = 1.0 - min(abs((lx + rx) / 2 - w / 2) / (w / 2), 1.0)
+    # Inclinación de la línea de los ojos
+    tilt = min(abs(ry - ly) / dx, 1.0)
+    return float(np.clip(symmetry * (1.0 - tilt), NO_EYES_FRONTAL_SCORE, 1.0))
+
+
+# Devuelve los índices de los mejores top_k frames con rostro, de mejor a peor
+def select_best_frames(frames, top_k=1, min_face_px=40):
+    scores = [score_frame(frame, min_face_px) for frame in frames]
+    ranked = sorted((i for i, s in enumerate(scores) if s['face'] is not None),
+                    key=lambda i: scores[i]['score'], reverse=True)
+    return ranked[:top_k], scores
@@ -0,0 +1,158 @@
+"""
+Base de datos en memoria que imita la parte del cliente de Supabase usada por
+validate_face_in_supabase().
+
+Soporta from_(tabla).select/insert/update + eq(...).execute() y las RPC de
+búsqueda por embedding (distancia coseno, como pgvector `<=>`). Sirve para
+ejecutar la lógica de decisión en modo lote sin tocar la base real.
+
+Formato del archivo semilla (JSON):
+    {
+        "users": [{"id": "...", "full_name": "...", "zones": [{"id": "..."}],
+                   "statuses": {"id": "..."}, "consecutive_denied_accesses": 0}],
+        "user_face_embeddings": [{"user_id": "...", "embedding": [...]}],
+        "observed_users": [{"id": "...", "embedding": [...], "status_id": "..."}]
+    }
+"""
+
+import copy
+import json
+import threading
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+# Vistas de Supabase que aquí se sirven directamente desde una tabla
+VIEW_TABLES = {'user_full_details_view': 'users'}
+
+
+def cosine_distance(a, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    denominator = np.linalg.norm(a) * np.linalg.norm(b)
+    if denominator == 0:
+        return 1.0
+    return float(1.0 - np.dot(a, b) / denominator)
+
+
+class InMemorySupabase:
+    def __init__(self, seed=None):
+        self.tables = {'users': [], 'user_face_embeddings': [], 'observed_users': [], 'logs': []}
+        self._lock = threading.RLock()
+        for table, rows in (seed or {}).items():
+            self.tables[table] = copy.deepcopy(rows)
+
+    @classmethod
+    def from_seed_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def from_(self, table):
+        return _TableQuery(self, VIEW_TABLES.get(table, table))
+
+    def rpc(self, name, params):
+        handler = getattr(self, f"_rpc_{name}", None)
+        if handler is None:
+            raise ValueError(f"RPC no soportada en la base en memoria: {name}")
+        return _Executable(lambda: handler(**params))
+
+    def _nearest(self, rows, query_embedding, match_threshold, match_count):
+        matches = []
+        for row in rows:
+            if row.get('embedding') is None:
+                continue
+            distance = cosine_distance(query_embedding, row['embedding'])
+            if distance <= match_threshold:
+                matches.append({**row, 'distance': distance})
+        matches.sort(key=lambda r: r['distance'])
+        return matches[:match_count]
+
+    def _rpc_match_user_face_embedding(self, query_embedding, match_threshold, match_count):
+        with self._lock:
+            return self._nearest(self.tables['user_face_embeddings'], query_embedding, match_threshold, match_count)
+
+    def _rpc_match_observed_face_embedding(self, query_embedding, match_threshold, match_count):
+        with self._lock:
+            return self._nearest(self.tables['observed_users'], query_embedding, match_threshold, match_count)
+
+    # Misma semántica que sql/apply_access_counter_deltas.sql
+    def _rpc_apply_access_counter_deltas(self, deltas):
+        with self._lock:
+            for delta in deltas:
+                for row in self.tables.get(delta['table'], []):
+                    if row.get('id') != delta['id']:
+                        continue
+                    denied = 0 if delta['reset_consecutive_denied'] else row.get('consecutive_denied_accesses') or 0
+                    row['consecutive_denied_accesses'] = denied + delta['consecutive_denied_delta']
+                    if delta['table'] == 'observed_users':
+                        row['access_count'] = (row.get('access_count') or 0) + delta['access_count_delta']
+                        if delta['last_seen_at']:
+                            row['last_seen_at'] = max(filter(None, (row.get('last_seen_at'), delta['last_seen_at'])))
+                        row['last_accessed_zones'] = sorted(set(row.get('last_accessed_zones') or []) | set(delta['accessed_zones']))
+            return None
+
+
+class _Executable:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return SimpleNamespace(data=copy.deepcopy(self._fn()))
+
+
+class _TableQuery:
+    def __init__(self, db, table):
+        self._db = db
+        self._table = table
+        self._action = 'select'
+        self._payload = None
+        self._filters = []
+
+    def select(self, columns='*'):
+        self._action = 'select'
+        return self
+
+    def insert(self, rows):
+        self._action = 'insert'
+        self._payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values):
+        self._action = 'update'
+        self._payload = values
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def _matches(self, row):
+        return all(row.get(column) == value for column, value in self._filters)
+
+    def execute(self):
+        db = self._db
+        with db._lock:
+            rows = db.tables.setdefault(self._table, [])
+            if self._action == 'insert':
+                now = datetime.now(timezone.utc).isoformat()
+                inserted = []
+                for payload in self._payload:
+                    row = {'id': str(uuid.uuid4()), 'created_at': now, **payload}
+                    if self._table == 'observed_users':
+                        row.setdefault('first_seen_at', now)
+                        row.setdefault('last_seen_at', now)
+                        row.setdefault('access_count', 1)
+                    rows.append(row)
+                    inserted.append(row)
+                data = inserted
+            elif self._action == 'update':
+                data = []
+                for row in rows:
+                    if self._matches(row):
+                        row.update(self._payload)
+                        data.append(row)
+            else:
+                data = [row for row in rows if self._matches(row)]
+            return SimpleNamespace(data=copy.deepcopy(data))
@@ -0,0 +1,191 @@
+"""
+Modo de memoria acotada para equipos de borde con poca RAM.
+
+- FramePool: buffers de frame preasignados y reutilizados entre ciclos; la
+  captura escribe directamente en ellos con cap.read(buffer); los frames
+  reproducidos se copian a ellos con load().
+- configure_tensorflow(): limita hilos de TensorFlow y, si hay GPU, su memoria.
+- limit_malloc_arenas() / trim_heap(): evita que glibc retenga memoria liberada
+  (causa típica de RSS que sube lentamente durante días).
+- MemoryReporter: reporte periódico de RSS (anónima y mapeada a archivo) y,
+  opcionalmente, de las líneas que más memoria asignan (tracemalloc).
+"""
+
+import ctypes
+import ctypes.util
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+M_ARENA_MAX = -8  # Constante de mallopt() en glibc
+
+
+class FramePool:
+    def __init__(self, size):
+        self.size = size
+        self.shape = None
+        self.dtype = None
+        self.stats = {'reused': 0, 'overflow': 0, 'reshaped': 0}
+        self._free = []
+        self._in_use = []
+
+    def configure(self, shape, dtype=np.uint8):
+        if self.shape is not None:
+            self.stats['reshaped'] += 1
+            print(f"⚠️ [MEMORY] Cambio de forma de frame {self.shape} -> {tuple(shape)}, reasignando pool")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._free = [np.empty(self.shape, dtype=self.dtype) for _ in range(self.size)]
+        self._in_use = []
+        mb = self.size * int(np.prod(self.shape)) * self.dtype.itemsize / (1024 * 1024)
+        print(f"✅ [MEMORY] Pool de frames: {self.size} buffers de {self.shape} ({mb:.1f} MB)")
+
+    # Buffer libre del pool, o None si el pool no está configurado o está agotado
+    def acquire(self):
+        if not self._free:
+            if self.shape is not None:
+                self.stats['overflow'] += 1
+            return None
+        buffer = self._free.pop()
+        self._in_use.append(buffer)
+        self.stats['reused'] += 1
+        return buffer
+
+    # Devolver todos los buffers al terminar el ciclo
+    def release_all(self):
+        self._free.extend(self._in_use)
+        self._in_use = []
+
+    # Leer un frame de un cv2.VideoCapture directamente sobre un buffer del pool
+    def read(self, capture):
+        buffer = self.acquire()
+        ret, frame = capture.read(buffer) if buffer is not None else capture.read()
+        if not ret or frame is None:
+            return None
+        if frame is buffer:
+            return frame
+
+        # Primer frame, cambio de resolución o pool agotado: configurar y copiar una sola vez
+        return self._store(frame, buffer)
+
+    # Copiar un frame ya decodificado (p. ej. una vista del archivo de reproducción) a un buffer del pool
+    def load(self, frame):
+        return self._store(frame, self.acquire())
+
+    def _store(self, frame, buffer):
+        if self.shape != frame.shape or self.dtype != frame.dtype:
+            # configure() descarta también los buffers en uso: los frames ya entregados
+            # siguen siendo válidos, pero dejan de pertenecer al pool
+            self.configure(frame.shape, frame.dtype)
+            buffer = self.acquire()
+        if buffer is None:
+            return frame
+        np.copyto(buffer, frame)
+        return buffer
+
+
+def configure_tensorflow(intra_op_threads=0, inter_op_threads=0, gpu_memory_limit_mb=0):
+    try:
+        import tensorflow as tf
+    except ImportError:
+        print("⚠️ [MEMORY] TensorFlow no disponible, se omite su configuración")
+        return
+    try:
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        for gpu in tf.config.list_physical_devices('GPU'):
+            if gpu_memory_limit_mb:
+                tf.config.set_logical_device_configuration(
+                    gpu, [tf.config.LogicalDeviceConfiguration(memory_limit=gpu_memory_limit_mb)])
+            else:
+                tf.config.experimental.set_memory_growth(gpu, True)
+        print(f"✅ [MEMORY] TensorFlow: intra_op={intra_op_threads or 'auto'} inter_op={inter_op_threads or 'auto'} "
+              f"límite GPU={gpu_memory_limit_mb or 'crecimiento'} MB")
+    except RuntimeError as e:
+        # TensorFlow ya inicializado: la configuración solo aplica antes del primer uso
+        print(f"⚠️ [MEMORY] No se pudo configurar TensorFlow: {e}")
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+        return libc if hasattr(libc, 'mallopt') and hasattr(libc, 'malloc_trim') else None
+    except OSError:
+        return None
+
+
+_libc = _load_libc()
+
+
+def limit_malloc_arenas(arenas):
+    if _libc is None or not arenas:
+        return False
+    return bool(_libc.mallopt(M_ARENA_MAX, int(arenas)))
+
+
+# Devolver al sistema la memoria libre del heap de glibc
+def trim_heap():
+    if _libc is None:
+        return False
+    return bool(_libc.malloc_trim(0))
+
+
+def read_memory_usage():
+    usage = {}
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile', 'VmHWM'):
+                    usage[key] = int(value.split()[0]) / 1024  # kB -> MB
+    except OSError:
+        try:
+            import resource
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            usage['VmHWM'] = maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+        except ImportError:
+            pass
+    return usage
+
+
+class MemoryReporter:
+    def __init__(self, report_every=50, trace_allocations=False, top_allocations=5):
+        self.report_every = report_every
+        self.top_allocations = top_allocations
+        self.cycles = 0
+        self.started_at = time.monotonic()
+        self.baseline = read_memory_usage()
+        self._snapshot = None
+        if trace_allocations:
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def cycle_finished(self, frame_pool=None):
+        self.cycles += 1
+        if self.report_every and self.cycles % self.report_every == 0:
+            self.report(frame_pool)
+
+    def report(self, frame_pool=None):
+        trim_heap()
+        usage = read_memory_usage()
+        hours = (time.monotonic() - self.started_at) / 3600
+        print(f"🧮 [MEMORY] Ciclo {self.cycles} ({hours:.2f} h):")
+        for key in ('VmRSS', 'RssAnon', 'RssFile', 'VmHWM'):
+            if key in usage:
+                delta = usage[key] - self.baseline.get(key, usage[key])
+                print(f"   🧮 [MEMORY] {key}: {usage[key]:.1f} MB ({delta:+.1f} MB desde el inicio)")
+        if frame_pool is not None:
+            print(f"   🧮 [MEMORY] Pool de frames: {frame_pool.stats}")
+
+        if self._snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            for stat in snapshot.compare_to(self._snapshot, 'lineno')[:self.top_allocations]:
+                print(f"   🧮 [MEMORY] {stat}")
+            self._snapshot = snapshot
+        return usage
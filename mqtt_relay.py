@@ -0,0 +1,227 @@
+"""
+Envío confiable de comandos al relé de la puerta por MQTT.
+
+- Sesión persistente (clean_session=False con client_id fijo) y reconexión
+  automática con backoff exponencial a cargo del hilo de paho.
+- Cada comando QoS 1 espera el PUBACK del broker con timeout: un comando solo
+  cuenta como enviado cuando el broker lo confirmó. Un comando vencido se quita
+  de la cola de paho para que no se reenvíe al reconectar (abriría la puerta
+  cuando la persona ya se fue) y su PUBACK tardío se ignora.
+- Se mide la latencia publicación -> PUBACK de cada comando.
+- Los "ON" repetidos dentro de la ventana de pulso del relé no se reenvían.
+"""
+
+import threading
+import time
+from collections import deque
+
+import paho.mqtt
+import paho.mqtt.client as mqtt
+
+# _discard_unacked() usa atributos privados de paho-mqtt 1.6.1 (versión fijada en
+# requirements.txt). Si cambian, RelayCommander falla al crearse en vez de dejar
+# que un comando fallido se reenvíe al reconectar.
+PAHO_TESTED_VERSION = '1.6.1'
+PAHO_PRIVATE_ATTRS = ('_out_message_mutex', '_out_messages', '_inflight_messages',
+                      '_max_inflight_messages', '_update_inflight')
+
+
+class RelayCommander:
+    def __init__(self, host, port, topic, client_id, username=None, password=None, keepalive=30,
+                 ack_timeout=2.0, pulse_window=3.0, connect_wait=1.0,
+                 reconnect_min_delay=1, reconnect_max_delay=30, latency_samples=1000, verbose=True):
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.keepalive = keepalive
+        self.ack_timeout = ack_timeout
+        self.pulse_window = pulse_window
+        self.connect_wait = connect_wait
+        self.verbose = verbose
+        self.on_connected = []  # Funciones f(client) a ejecutar en cada (re)conexión
+        self.stats = {'sent': 0, 'acked': 0, 'timeouts': 0, 'late_acks': 0, 'discarded': 0, 'deduped': 0,
+                      'failed': 0, 'connects': 0, 'disconnects': 0}
+        self.latencies_ms = deque(maxlen=latency_samples)
+
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self._pending = {}  # mid -> [Event, hora de publicación, hora de PUBACK]
+        self._early_acks = {}  # mid -> hora de PUBACK recibido antes de registrar el mid
+        self._last_on_acked_at = None
+        self._inflight_on = None
+
+        self.client = mqtt.Client(client_id=client_id, clean_session=False)
+        missing = [name for name in PAHO_PRIVATE_ATTRS if not hasattr(self.client, name)]
+        if missing:
+            raise RuntimeError(f"paho-mqtt {paho.mqtt.__version__} no es compatible con RelayCommander "
+                               f"(faltan {', '.join(missing)}; probado con {PAHO_TESTED_VERSION})")
+        if paho.mqtt.__version__ != PAHO_TESTED_VERSION:
+            print(f"⚠️ [MQTT] paho-mqtt {paho.mqtt.__version__}: RelayCommander fue probado con {PAHO_TESTED_VERSION}")
+        if username and password:
+            self.client.username_pw_set(username, password)
+        self.client.reconnect_delay_set(min_delay=reconnect_min_delay, max_delay=reconnect_max_delay)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+
+    # Conexión en segundo plano: paho reintenta con backoff hasta lograrlo
+    def start(self):
+        self.client.connect_async(self.host, self.port, self.keepalive)
+        self.client.loop_start()
+
+    def wait_connected(self, timeout):
+        return self._connected.wait(timeout)
+
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            print(f"❌ [MQTT] Error de conexión MQTT: {rc}")
+            return
+        self.stats['connects'] += 1
+        session = "reanudada" if flags.get('session present') else "nueva"
+        print(f"✅ [MQTT] Conectado al broker MQTT exitosamente (sesión {session})")
+        self._connected.set()
+        for callback in self.on_connected:
+            try:
+                callback(client)
+            except Exception as e:
+                print(f"❌ [MQTT] Error en callback de conexión: {e}")
+
+    def _on_disconnect(self, client, userdata, rc):
+        self._connected.clear()
+        self.stats['disconnects'] += 1
+        if rc != 0:
+            print(f"⚠️ [MQTT] Desconexión inesperada (código: {rc}), reconectando...")
+        else:
+            print("✅ [MQTT] Desconexión normal")
+
+    # Para QoS 1 paho llama on_publish al recibir el PUBACK
+    def _on_publish(self, client, userdata, mid):
+        acked_at = time.monotonic()
+        with self._lock:
+            # PUBACKs sin comando que los espere y más viejos que el timeout ya no sirven
+            for old_mid, old_at in list(self._early_acks.items()):
+                if acked_at - old_at > self.ack_timeout:
+                    del self._early_acks[old_mid]
+            pending = self._pending.get(mid)
+            if pending is None:
+                self._early_acks[mid] = acked_at
+                return
+            pending[2] = acked_at
+        pending[0].set()
+
+    # Quitar un comando vencido o fallido de la cola de salida de paho: de lo contrario
+    # se reenvía al reconectar (paho lo hace incluso con sesión limpia)
+    def _discard_unacked(self, mid):
+        client = self.client
+        with client._out_message_mutex:
+            message = client._out_messages.pop(mid, None)
+            if message is None:
+                return False
+            if message.state == mqtt.mqtt_ms_wait_for_puback:
+                client._inflight_messages -= 1
+                if client._max_inflight_messages > 0:
+                    client._update_inflight()
+        self.stats['discarded'] += 1
+        return True
+
+    def _publish_and_wait(self, message):
+        published_at = time.monotonic()
+        info = self.client.publish(self.topic, message, qos=1)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            # paho deja el mensaje encolado (p. ej. MQTT_ERR_NO_CONN) y lo enviaría al reconectar
+            self._discard_unacked(info.mid)
+            print(f"❌ [MQTT] Error enviando comando: {info.rc}")
+            self.stats['failed'] += 1
+            return False
+
+        self.stats['sent'] += 1
+        pending = [threading.Event(), published_at, None]
+        with self._lock:
+            acked_at = self._early_acks.pop(info.mid, None)
+            # Un PUBACK anterior a esta publicación es de otro comando con el mismo mid
+            if acked_at is None or acked_at < published_at:
+                self._pending[info.mid] = pending
+            else:
+                pending[2] = acked_at
+                pending[0].set()
+
+        acked = pending[0].wait(self.ack_timeout)
+        with self._lock:
+            self._pending.pop(info.mid, None)
+        if acked and pending[2] - published_at > self.ack_timeout:
+            # Confirmado tarde (p. ej. tras una reconexión): no cuenta como éxito
+            self.stats['late_acks'] += 1
+            acked = False
+        if not acked:
+            self.stats['timeouts'] += 1
+            # Fuera del lock propio: paho llama on_publish con su mutex tomado
+            self._discard_unacked(info.mid)
+            with self._lock:
+                self._early_acks.pop(info.mid, None)
+            print(f"❌ [MQTT] Sin PUBACK del broker en {self.ack_timeout:.1f} s (ID: {info.mid})")
+            return False
+
+        latency_ms = (pending[2] - published_at) * 1000
+        self.latencies_ms.append(latency_ms)
+        self.stats['acked'] += 1
+        if self.verbose:
+            print(f"✅ [MQTT] PUBACK recibido (ID: {info.mid}, {latency_ms:.1f} ms)")
+        return True
+
+    # Enviar un comando y esperar confirmación del broker; devuelve True si fue confirmado
+    def send(self, message):
+        if message == "ON":
+            with self._lock:
+                inflight = self._inflight_on
+                recent = (self._last_on_acked_at is not None
+                          and time.monotonic() - self._last_on_acked_at < self.pulse_window)
+                if inflight is None and not recent:
+                    inflight = self._inflight_on = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                # El relé ya está en su pulso (o a punto): no se reenvía
+                self.stats['deduped'] += 1
+                if recent:
+                    if self.verbose:
+                        print(f"🔁 [MQTT] ON omitido: el relé sigue en su ventana de pulso ({self.pulse_window:.1f} s)")
+                    return True
+                inflight.wait(self.ack_timeout)
+                return self._last_on_acked_at is not None and time.monotonic() - self._last_on_acked_at < self.pulse_window
+        else:
+            owner = False
+            with self._lock:
+                self._last_on_acked_at = None
+
+        try:
+            if not self._connected.is_set() and not self._connected.wait(self.connect_wait):
+                print("❌ [MQTT] Cliente MQTT no está conectado")
+                self.stats['failed'] += 1
+                return False
+            acked = self._publish_and_wait(message)
+            if acked and message == "ON":
+                self._last_on_acked_at = time.monotonic()
+            return acked
+        finally:
+            if owner:
+                with self._lock:
+                    event, self._inflight_on = self._inflight_on, None
+                event.set()
+
+    def latency_summary(self):
+        samples = sorted(self.latencies_ms)
+        if not samples:
+            return None
+
+        def percentile(p):
+            return samples[min(int(len(samples) * p / 100), len(samples) - 1)]
+
+        return {'count': len(samples), 'p50_ms': percentile(50), 'p99_ms': percentile(99), 'max_ms': samples[-1]}
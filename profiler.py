@@ -0,0 +1,202 @@
+"""
+Perfilado bajo demanda y captura de decisiones lentas para OpenDoor.
+
+- SamplingProfiler: muestrea la pila del hilo principal durante N frames (solo
+  mientras un frame está en curso, no la espera entre ciclos) y escribe la salida en formato "collapsed stack" (compatible con flamegraph.pl
+  y speedscope).
+- DecisionTracer: mide las etapas de cada decisión y guarda la traza completa
+  solo cuando la decisión supera el umbral de latencia configurado.
+
+Ambos están pensados para quedar siempre instanciados: desactivados cuestan
+una comparación por frame y dos lecturas de reloj por etapa.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir="profiles", interval_ms=5.0):
+        self.output_dir = output_dir
+        self.interval = max(interval_ms, 0.5) / 1000.0
+        self._lock = threading.Lock()
+        self._pending_frames = 0
+        self._signal_frames = 0
+        self._remaining_frames = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._in_frame = threading.Event()
+        self._stacks = Counter()
+        self._target_thread_id = None
+
+    @property
+    def active(self):
+        return self._thread is not None
+
+    # Solicitar un perfil de N frames (0 cancela el perfil en curso)
+    def request(self, frames):
+        frames = max(int(frames), 0)
+        with self._lock:
+            self._pending_frames = frames
+            if frames == 0 and self._thread is not None:
+                self._remaining_frames = 0
+        if frames:
+            print(f"🔬 [PROFILER] Perfil solicitado para {frames} frames")
+        else:
+            print("🔬 [PROFILER] Perfil cancelado")
+
+    # Solicitud desde un manejador de señal: solo una asignación, sin lock ni print
+    # (el manejador corre en el hilo principal, que puede tener tomado el lock)
+    def request_from_signal(self, frames):
+        self._signal_frames = max(int(frames), 1)
+
+    # Llamar al inicio de cada frame desde el hilo que procesa
+    def frame_started(self):
+        if self._signal_frames:
+            frames, self._signal_frames = self._signal_frames, 0
+            self.request(frames)
+        if self._thread is not None:
+            self._in_frame.set()
+        if not self._pending_frames:
+            return
+        with self._lock:
+            if self._thread is not None or not self._pending_frames:
+                return
+            self._remaining_frames = self._pending_frames
+            self._pending_frames = 0
+            self._stacks = Counter()
+            self._target_thread_id = threading.get_ident()
+            self._stop_event.clear()
+            self._in_frame.set()
+            self._thread = threading.Thread(target=self._sample_loop, name="opendoor-profiler", daemon=True)
+            self._thread.start()
+        print(f"🔬 [PROFILER] Muestreando pila durante {self._remaining_frames} frames...")
+
+    # Llamar al final de cada frame; al agotar los frames escribe el perfil
+    def frame_finished(self):
+        if self._thread is None:
+            return None
+        self._in_frame.clear()
+        with self._lock:
+            self._remaining_frames -= 1
+            if self._remaining_frames > 0:
+                return None
+        return self._finish()
+
+    def _finish(self):
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        return self._write_output()
+
+    def _sample_loop(self):
+        target = self._target_thread_id
+        while not self._stop_event.wait(self.interval):
+            # Entre frames (p. ej. el sleep de main()) no se muestrea
+            if not self._in_frame.is_set():
+                continue
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self._stacks[";".join(stack)] += 1
+
+    def _write_output(self):
+        if not self._stacks:
+            print("⚠️ [PROFILER] Perfil vacío, no se escribió archivo")
+            return None
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(self.output_dir, f"profile-{stamp}.collapsed")
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            total = sum(self._stacks.values())
+            print(f"✅ [PROFILER] Perfil guardado: {path} ({total} muestras)")
+            return path
+        except Exception as e:
+            print(f"❌ [PROFILER] Error guardando perfil: {e}")
+            return None
+
+
+class DecisionTracer:
+    def __init__(self, output_path="profiles/slow_decisions.jsonl", threshold_ms=0.0):
+        self.output_path = output_path
+        self.threshold_ms = threshold_ms
+        self._start = None
+        self._depth = 0
+        self._stages = []
+        self._context = {}
+
+    # Iniciar la traza de una decisión
+    def begin(self, source):
+        self._start = time.perf_counter()
+        self._depth = 0
+        self._stages = []
+        self._context = {'source': source}
+
+    # Agregar datos a la traza en curso (tipo de decisión, zona, etc.)
+    def annotate(self, **context):
+        self._context.update(context)
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._start is not None:
+                self._stages.append((name, self._depth, started, time.perf_counter()))
+
+    # Cerrar la traza; se guarda solo si supera el umbral
+    def end(self):
+        if self._start is None:
+            return None
+        total_ms = (time.perf_counter() - self._start) * 1000
+        start = self._start
+        self._start = None
+        if not self.threshold_ms or total_ms < self.threshold_ms:
+            return None
+
+        record = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'total_ms': round(total_ms, 2),
+            'threshold_ms': self.threshold_ms,
+            **self._context,
+            'stages': [
+                {
+                    'name': name,
+                    'depth': depth,
+                    'start_ms': round((started - start) * 1000, 2),
+                    'duration_ms': round((finished - started) * 1000, 2),
+                }
+                for name, depth, started, finished in sorted(self._stages, key=lambda s: s[2])
+            ],
+        }
+        print(f"🐢 [TRACE] Decisión lenta: {total_ms:.0f} ms (umbral: {self.threshold_ms:.0f} ms)")
+        for stage in record['stages']:
+            indent = "   " * (stage['depth'] + 1)
+            print(f"{indent}⏱️ [TRACE] {stage['name']}: {stage['duration_ms']:.1f} ms")
+        try:
+            directory = os.path.dirname(self.output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except Exception as e:
+            print(f"❌ [TRACE] Error guardando traza: {e}")
+        return record
@@ -0,0 +1,48 @@
+-- Aplica de forma atómica los deltas acumulados por write_behind.py.
+-- Los incrementos se calculan en la base (col = col + delta), así que varias
+-- cámaras o workers pueden escribir a la vez sin perder incrementos.
+--
+-- deltas: [{"table": "users" | "observed_users", "id": "...",
+--           "reset_consecutive_denied": bool, "consecutive_denied_delta": int,
+--           "access_count_delta": int, "last_seen_at": timestamptz | null,
+--           "accessed_zones": [zone_id, ...]}]
+--
+-- Nota: last_accessed_zones se asume uuid[]; ajustar el cast si la columna es text[].
+
+create or replace function apply_access_counter_deltas(deltas jsonb)
+returns void
+language plpgsql
+as $$
+declare
+  d jsonb;
+begin
+  for d in select * from jsonb_array_elements(deltas)
+  loop
+    if d->>'table' = 'users' then
+      update users
+      set consecutive_denied_accesses =
+            case when (d->>'reset_consecutive_denied')::boolean then 0
+                 else coalesce(consecutive_denied_accesses, 0) end
+            + (d->>'consecutive_denied_delta')::int
+      where id = (d->>'id')::uuid;
+
+    elsif d->>'table' = 'observed_users' then
+      update observed_users
+      set access_count = coalesce(access_count, 0) + (d->>'access_count_delta')::int,
+          consecutive_denied_accesses =
+            case when (d->>'reset_consecutive_denied')::boolean then 0
+                 else coalesce(consecutive_denied_accesses, 0) end
+            + (d->>'consecutive_denied_delta')::int,
+          last_seen_at = greatest(last_seen_at, (d->>'last_seen_at')::timestamptz),
+          last_accessed_zones = array(
+            select distinct z
+            from unnest(
+              coalesce(last_accessed_zones, '{}'::uuid[])
+              || array(select jsonb_array_elements_text(d->'accessed_zones'))::uuid[]
+            ) as z
+          )
+      where id = (d->>'id')::uuid;
+    end if;
+  end loop;
+end;
+$$;
@@ -0,0 +1,207 @@
+"""
+Escritura diferida (write-behind) de contadores de users y observed_users.
+
+Cada decisión ya no hace su propio UPDATE con valores calculados a partir de
+una lectura posiblemente vieja. Los cambios se acumulan en memoria por
+identidad como deltas (incrementos, reinicio de denegados consecutivos,
+último visto, zonas) y se envían periódicamente en un solo llamado a la RPC
+apply_access_counter_deltas (sql/apply_access_counter_deltas.sql), que aplica
+los incrementos de forma atómica en la base. Así varias cámaras o workers no
+pierden incrementos y una ráfaga de decisiones se convierte en una escritura.
+
+Si la RPC no existe en la base se usa un UPDATE por identidad con el último
+valor leído más el delta acumulado (mismo comportamiento que antes, pero
+agrupado).
+"""
+
+import threading
+from datetime import datetime, timezone
+
+RPC_NAME = 'apply_access_counter_deltas'
+# PostgREST: función no encontrada (PGRST202) / Postgres: undefined_function (42883)
+MISSING_FUNCTION_CODES = ('PGRST202', '42883')
+
+
+# Solo la ausencia de la función justifica pasar a UPDATE por identidad; timeouts,
+# 5xx o cortes de red se reintentan con la RPC en el próximo flush
+def _is_missing_function(error):
+    code = getattr(error, 'code', None)
+    if code in MISSING_FUNCTION_CODES:
+        return True
+    return any(code in str(error) for code in MISSING_FUNCTION_CODES)
+
+
+def _new_delta(table, identity_id):
+    return {
+        'table': table,
+        'id': identity_id,
+        'reset_consecutive_denied': False,
+        'consecutive_denied_delta': 0,
+        'access_count_delta': 0,
+        'last_seen_at': None,
+        'accessed_zones': set(),
+        # Últimos valores leídos, solo para el modo sin RPC
+        'base_consecutive_denied': 0,
+        'base_access_count': 0,
+        'base_zones': set(),
+    }
+
+
+# Combinar dos deltas de la misma identidad (earlier ocurrió antes que later)
+def _merge(earlier, later):
+    merged = dict(later)
+    if not later['reset_consecutive_denied']:
+        merged['reset_consecutive_denied'] = earlier['reset_consecutive_denied']
+        merged['consecutive_denied_delta'] = earlier['consecutive_denied_delta'] + later['consecutive_denied_delta']
+    merged['access_count_delta'] = earlier['access_count_delta'] + later['access_count_delta']
+    merged['last_seen_at'] = max(filter(None, (earlier['last_seen_at'], later['last_seen_at'])), default=None)
+    merged['accessed_zones'] = earlier['accessed_zones'] | later['accessed_zones']
+    merged['base_zones'] = earlier['base_zones'] | later['base_zones']
+    return merged
+
+
+class CounterWriteBehind:
+    # get_client: función que devuelve el cliente de Supabase actual
+    def __init__(self, get_client, flush_interval=2.0, max_pending=500, use_rpc=True):
+        self.get_client = get_client
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.use_rpc = use_rpc
+        self.stats = {'recorded': 0, 'flushes': 0, 'rows_written': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.flush_interval <= 0 or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="opendoor-write-behind", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def _record(self, table, identity_id, zone_id=None, **changes):
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            delta = self._pending.get((table, identity_id))
+            if delta is None:
+                delta = self._pending[(table, identity_id)] = _new_delta(table, identity_id)
+            if changes.get('reset'):
+                delta['reset_consecutive_denied'] = True
+                delta['consecutive_denied_delta'] = 0
+            delta['consecutive_denied_delta'] += changes.get('denied', 0)
+            delta['access_count_delta'] += changes.get('access', 0)
+            if 'base_consecutive_denied' in changes:
+                delta['base_consecutive_denied'] = changes['base_consecutive_denied']
+            if 'base_access_count' in changes:
+                delta['base_access_count'] = changes['base_access_count']
+            delta['base_zones'] |= set(changes.get('base_zones') or [])
+            if zone_id is not None:
+                delta['last_seen_at'] = now
+                delta['accessed_zones'].add(zone_id)
+            self.stats['recorded'] += 1
+            pending_count = len(self._pending)
+
+        if self.flush_interval <= 0 or pending_count >= self.max_pending:
+            self.flush()
+
+    # Usuario registrado con acceso: reiniciar denegados consecutivos
+    def user_granted(self, user_id):
+        self._record('users', user_id, reset=True)
+
+    # Usuario registrado sin acceso a la zona: +1 denegado consecutivo
+    def user_denied(self, user_id, base_consecutive_denied):
+        self._record('users', user_id, denied=1, base_consecutive_denied=base_consecutive_denied)
+
+    # Usuario observado con acceso: +1 acceso, reiniciar denegados, último visto y zona
+    def observed_granted(self, observed_id, zone_id, base_access_count, base_zones):
+        self._record('observed_users', observed_id, zone_id, access=1, reset=True,
+                     base_access_count=base_access_count, base_zones=base_zones)
+
+    # Usuario observado expirado: +1 denegado consecutivo, último visto y zona
+    def observed_denied(self, observed_id, zone_id, base_consecutive_denied, base_zones):
+        self._record('observed_users', observed_id, zone_id, denied=1,
+                     base_consecutive_denied=base_consecutive_denied, base_zones=base_zones)
+
+    # Enviar todos los deltas acumulados; si falla se vuelven a encolar
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            count = len(batch)
+
+            try:
+                client = self.get_client()
+                if client is None:
+                    raise RuntimeError("cliente de Supabase no disponible")
+                if self.use_rpc:
+                    try:
+                        self._flush_rpc(client, batch.values())
+                    except Exception as e:
+                        if not _is_missing_function(e):
+                            raise
+                        print(f"⚠️ [WRITE_BEHIND] RPC {RPC_NAME} no disponible ({e}), se usarán UPDATE por identidad")
+                        self.use_rpc = False
+                if not self.use_rpc:
+                    self._flush_updates(client, batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ [WRITE_BEHIND] Error escribiendo contadores ({len(batch)} identidades): {e}")
+                with self._lock:
+                    for key, delta in batch.items():
+                        later = self._pending.get(key)
+                        self._pending[key] = _merge(delta, later) if later else delta
+                return 0
+
+            self.stats['flushes'] += 1
+            self.stats['rows_written'] += count
+            print(f"💾 [WRITE_BEHIND] {count} identidades actualizadas")
+            return count
+
+    def _flush_rpc(self, client, deltas):
+        payload = []
+        for delta in deltas:
+            payload.append({
+                'table': delta['table'],
+                'id': delta['id'],
+                'reset_consecutive_denied': delta['reset_consecutive_denied'],
+                'consecutive_denied_delta': delta['consecutive_denied_delta'],
+                'access_count_delta': delta['access_count_delta'],
+                'last_seen_at': delta['last_seen_at'],
+                'accessed_zones': sorted(delta['accessed_zones']),
+            })
+        client.rpc(RPC_NAME, {'deltas': payload}).execute()
+
+    def _flush_updates(self, client, batch):
+        done = []
+        try:
+            for key, delta in batch.items():
+                base_denied = 0 if delta['reset_consecutive_denied'] else delta['base_consecutive_denied']
+                values = {'consecutive_denied_accesses': base_denied + delta['consecutive_denied_delta']}
+                if delta['table'] == 'observed_users':
+                    if delta['access_count_delta']:
+                        values['access_count'] = delta['base_access_count'] + delta['access_count_delta']
+                    if delta['last_seen_at']:
+                        values['last_seen_at'] = delta['last_seen_at']
+                    if delta['accessed_zones']:
+                        values['last_accessed_zones'] = sorted(delta['base_zones'] | delta['accessed_zones'])
+                client.from_(delta['table']).update(values).eq('id', delta['id']).execute()
+                done.append(key)
+        finally:
+            # Las identidades ya escritas no se vuelven a encolar si falla una posterior
+            for key in done:
+                batch.pop(key)